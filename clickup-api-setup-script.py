@@ -5,10 +5,14 @@ Fido Ticketing – ClickUp Scaffolding (final)
 - Idempotent creation/reuse of Space → Folder → Lists
 - Applies per-list statuses: Open → In Progress → Resolved → Closed
 - Creates/reuses custom fields with existence checks
+- Validates field definitions locally before any API call
 - Uses compatible field types (short_text for Slack Permalink)
+- Resolves lists from one folder listing; creates lists, applies statuses and creates fields concurrently (one bounded worker pool)
 - Collects dropdown OPTION IDs (label -> id) for Slack mapping
+- Keep-alive session per worker thread; 429 (and 5xx on GET/PUT) retried with full-jitter backoff, honoring Retry-After
 - Ensures Custom Fields ClickApp is enabled (fails fast if not)
 - Dry run support (--dry-run or DRY_RUN=true)
+- Re-runs stop after one GET when the previous config is still current (--force to re-check)
 - Exports:
     config/clickupFields.json        (full detail)
     config/clickupFields-adapted.json (lists/fields/options map for Slack)
@@ -16,13 +20,20 @@ Fido Ticketing – ClickUp Scaffolding (final)
     clickup-env-vars.txt              (ENV lines)
 """
 
-import os, sys, json, time, argparse
-from typing import Dict, Any, List, Optional
+import os, sys, json, time, random, argparse, threading
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping, Optional, Tuple, Union
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-API_TOKEN = os.getenv("CLICKUP_API_TOKEN")
-TEAM_ID   = os.getenv("CLICKUP_TEAM_ID")
-DRY_ENV   = os.getenv("DRY_RUN", "false").lower() == "true"
+# secrets pasted into CI often carry a trailing newline
+API_TOKEN = (os.getenv("CLICKUP_API_TOKEN") or "").strip() or None
+TEAM_ID   = (os.getenv("CLICKUP_TEAM_ID") or "").strip() or None
+DRY_ENV   = os.getenv("DRY_RUN", "false").strip().lower() == "true"
+
+API_BASE = "https://api.clickup.com/api/v2"
 
 SPACE_NAME  = "Fido Operations"
 FOLDER_NAME = "CX Tickets"
@@ -38,85 +49,234 @@ STATUS_WORKFLOW = [
     {"status": "Resolved",    "type": "custom", "color": "#2ecc71"},
     {"status": "Closed",      "type": "closed", "color": "#6b7280"},
 ]
+# identical PUT body for every list, so encode it once
+STATUS_WORKFLOW_BODY = json.dumps({"override_statuses": True, "statuses": STATUS_WORKFLOW}).encode()
 
-MARKET_CODES = [
+MARKET_CODES = (
     "ATX","ANA","CHS","CLT","DEN","DFW","FLL","GEG","HOT","JAX","LAX","LIT",
     "PHX","PIE","SAN","SAT","SDX","SEA","SLC","SRQ","STA","STS","VPS","MISC"
-]
-
-COMMON_FIELDS = [
-    {"name": "Slack Ticket ID",             "type": "short_text"},
-    {"name": "Slack Permalink",             "type": "short_text"},  # URL can be plan-limited
-    {"name": "Submitted By (Slack User)",   "type": "short_text"},
-    {"name": "Customer Name",               "type": "short_text"},
-    {"name": "Market Code",                 "type": "dropdown", "options": MARKET_CODES},
-    {"name": "Property/Unit",               "type": "short_text"},
-    {"name": "Notes",                       "type": "text"},
-]
-
-ISSUE_FIELDS = [
-    {"name": "Issue Type",      "type": "dropdown", "options": [
+)
+
+# option lists shared by more than one field
+PRIORITY_LEVELS = ("urgent","high","normal","low")
+WEEKDAYS        = ("monday","tuesday","wednesday","thursday","friday","saturday","sunday")
+
+def _frozen(*defs: Dict[str, Any]) -> Tuple[Mapping[str, Any], ...]:
+    """Read-only field defs; the same objects are shared by every list and worker thread."""
+    return tuple(MappingProxyType(d) for d in defs)
+
+# "key" is the normalized name Slack uses for the field in the generated config
+COMMON_FIELDS = _frozen(
+    {"name": "Slack Ticket ID",           "key": "slack_ticket_id", "type": "short_text"},
+    {"name": "Slack Permalink",           "key": "slack_permalink", "type": "short_text"},  # URL can be plan-limited
+    {"name": "Submitted By (Slack User)", "key": "submitted_by",    "type": "short_text"},
+    {"name": "Customer Name",             "key": "customer_name",   "type": "short_text"},
+    {"name": "Market Code",               "key": "market_code",     "type": "dropdown", "options": MARKET_CODES},
+    {"name": "Property/Unit",             "key": "property_unit",   "type": "short_text"},
+    {"name": "Notes",                     "key": "notes",           "type": "text"},
+)
+
+ISSUE_FIELDS = _frozen(
+    {"name": "Issue Type",     "key": "issue_type", "type": "dropdown", "options": (
         "bin_placement","access_problem","schedule_conflict","property_logistics",
         "service_quality","customer_complaint","equipment_issue","other"
-    ]},
-    {"name": "Priority Level",  "type": "dropdown", "options": ["urgent","high","normal","low"]},
-]
+    )},
+    {"name": "Priority Level", "key": "priority",   "type": "dropdown", "options": PRIORITY_LEVELS},
+)
 
-INQUIRY_FIELDS = [
-    {"name": "Inquiry Type",        "type": "dropdown", "options": [
+INQUIRY_FIELDS = _frozen(
+    {"name": "Inquiry Type",      "key": "inquiry_type",      "type": "dropdown", "options": (
         "schedule_question","service_status","billing_question","service_details",
         "new_service","pause_resume","property_update","general_info","other"
-    ]},
-    {"name": "Response Priority",   "type": "dropdown", "options": ["urgent","high","normal","low"]},
-]
+    )},
+    {"name": "Response Priority", "key": "response_priority", "type": "dropdown", "options": PRIORITY_LEVELS},
+)
 
-UNIT_FIELDS = [
-    {"name": "Change Type",         "type": "dropdown", "options": ["new_unit","cancellation","pause","restart","modify"]},
-    {"name": "Trash Pickup Day",    "type": "dropdown", "options": ["monday","tuesday","wednesday","thursday","friday","saturday","sunday"]},
-    {"name": "Recycling Day",       "type": "dropdown", "options": ["same_as_trash","monday","tuesday","wednesday","thursday","friday","saturday","sunday","none"]},
-    {"name": "Effective Date",      "type": "date"},
-]
+UNIT_FIELDS = _frozen(
+    {"name": "Change Type",      "key": "change_type",    "type": "dropdown", "options": ("new_unit","cancellation","pause","restart","modify")},
+    {"name": "Trash Pickup Day", "key": "trash_day",      "type": "dropdown", "options": WEEKDAYS},
+    {"name": "Recycling Day",    "key": "recycling",      "type": "dropdown", "options": ("same_as_trash", *WEEKDAYS, "none")},
+    {"name": "Effective Date",   "key": "effective_date", "type": "date"},
+)
+
+# field types this script knows how to create
+FIELD_TYPES = {"short_text", "text", "dropdown", "date", "url", "checkbox", "number", "email", "phone"}
 
 LIST_TO_FIELDS = {
-    "issues":    COMMON_FIELDS + ISSUE_FIELDS,
-    "inquiries": COMMON_FIELDS + INQUIRY_FIELDS,
-    "units":     COMMON_FIELDS + UNIT_FIELDS,
+    "issues":    (*COMMON_FIELDS, *ISSUE_FIELDS),
+    "inquiries": (*COMMON_FIELDS, *INQUIRY_FIELDS),
+    "units":     (*COMMON_FIELDS, *UNIT_FIELDS),
 }
 
-# ------------- HTTP helpers -------------
-
-def hdrs(token: str) -> Dict[str, str]:
-    return {"Authorization": token, "Content-Type": "application/json"}
-
-def _sleep(i=1): time.sleep(0.2 * i)
+API_WORKERS = 8  # concurrent status/field requests; keeps us well under ClickUp's per-token rate limit
 
-def get_json(url: str, token: str) -> Any:
-    r = requests.get(url, headers=hdrs(token), timeout=30)
-    _sleep()
-    r.raise_for_status()
-    return r.json()
-
-def post_json(url: str, token: str, payload: Dict[str, Any]) -> Any:
-    r = requests.post(url, headers=hdrs(token), data=json.dumps(payload), timeout=30)
-    _sleep()
-    if not (200 <= r.status_code < 300):
-        raise requests.HTTPError(f"{r.status_code} {r.text}", response=r)
-    return r.json() if r.text else {}
+# ------------- HTTP helpers -------------
 
-def put_json(url: str, token: str, payload: Dict[str, Any]) -> Any:
-    r = requests.put(url, headers=hdrs(token), data=json.dumps(payload), timeout=30)
-    _sleep()
+RATE_LIMIT_PER_MIN = 100  # ClickUp's per-token limit on most plans
+RATE_LIMIT_FLOOR   = 5    # requests left in the server window before we wait for it to reset
+
+def _body(payload: Union[Dict[str, Any], bytes, None]) -> Dict[str, Any]:
+    """Pre-encoded bytes go out as-is; dicts use requests' own json= encoding."""
+    if payload is None:
+        return {}
+    return {"data": payload} if isinstance(payload, bytes) else {"json": payload}
+
+class TokenBucket:
+    """Client-side pacing shared by all workers, so bursts never reach ClickUp's limiter.
+
+    Holds up to `capacity` tokens refilled at `rate` per second; `sync` also parks
+    every caller until the server window resets once ClickUp says it's nearly spent.
+    The rate adapts AIMD-style: halved (down to `rate_min`) and drained on every 429,
+    then grown back by `step` per success up to `rate_max`.
+    """
+
+    def __init__(self, rate: float, capacity: int, rate_min: float = 0.2, step: float = 0.1):
+        self.rate         = rate
+        self.rate_max     = rate
+        self.rate_min     = rate_min
+        self.step         = step
+        self.capacity     = capacity
+        self.tokens       = float(capacity)
+        self.updated      = time.monotonic()
+        self.paused_until = 0.0  # wall-clock time, as in X-RateLimit-Reset
+        self.cond         = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens  = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        with self.cond:
+            while True:
+                self._refill()
+                wait = max(self.paused_until - time.time(), (1 - self.tokens) / self.rate)
+                if wait <= 0:
+                    self.tokens -= 1
+                    return
+                self.cond.wait(wait)
+
+    def on_success(self):
+        with self.cond:
+            self.rate = min(self.rate_max, self.rate + self.step)
+
+    def on_fail(self):
+        with self.cond:
+            self._refill()
+            self.rate   = max(self.rate_min, self.rate * 0.5)
+            self.tokens = 0.0
+
+    def sync(self, r: requests.Response):
+        """Follow ClickUp's X-RateLimit-* headers when its window is nearly spent."""
+        if r.ok:
+            self.on_success()
+        remaining = int(r.headers.get("X-RateLimit-Remaining", RATE_LIMIT_FLOOR))
+        if remaining < RATE_LIMIT_FLOOR:
+            with self.cond:
+                self.paused_until = max(self.paused_until, int(r.headers.get("X-RateLimit-Reset", 0)))
+
+BUCKET = TokenBucket(rate=RATE_LIMIT_PER_MIN / 60, capacity=RATE_LIMIT_PER_MIN)
+
+class RateLimitExceeded(requests.HTTPError):
+    """Still 429 after every retry."""
+
+_rng = random.SystemRandom()  # decorrelated across concurrent CI runners
+
+class FullJitterRetry(Retry):
+    """Retry with full-jitter backoff: sleep uniform(0, min(backoff_max, factor * 2**n)).
+
+    Retry-After, when ClickUp sends it, still takes precedence (urllib3 checks it first).
+    """
+
+    def get_backoff_time(self) -> float:
+        attempt = max(0, len(self.history) - 1)
+        return _rng.uniform(0, min(self.backoff_max, self.backoff_factor * 2 ** attempt))
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        # A 5xx or dropped response on a create may follow a committed write, and replaying it
+        # leaves a duplicate space/folder/list/field; ClickUp's 429 is sent before any work is done.
+        if method.upper() == "POST":
+            return status_code == 429
+        return super().is_retry(method, status_code, has_retry_after)
+
+    def increment(self, method=None, url=None, response=None, *args, **kwargs):
+        # 429s are retried in here and never reach _send, so slow the shared bucket from here
+        if response is not None and response.status == 429:
+            BUCKET.on_fail()
+        return super().increment(method, url, response, *args, **kwargs)
+
+def new_session() -> requests.Session:
+    # GET and PUT are idempotent, so they retry on 429/5xx and on read errors. POST is left out of
+    # allowed_methods (no replay after a read error) and FullJitterRetry.is_retry lets it retry on 429 only.
+    retry = FullJitterRetry(total=8, backoff_factor=0.5, backoff_max=30,
+                            status_forcelist=[429, 500, 502, 503, 504], respect_retry_after_header=True,
+                            allowed_methods=["GET", "PUT"], raise_on_status=False)
+    s = requests.Session()
+    s.headers.update({
+        "Authorization":   API_TOKEN,
+        "Content-Type":    "application/json",
+        "Accept":          "application/json",
+        "Accept-Encoding": "gzip, deflate",
+    })
+    s.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=retry))
+    return s
+
+_local = threading.local()
+_sessions: List[requests.Session] = []  # every session handed out, so they can be closed at exit
+
+def session() -> requests.Session:
+    """This thread's Session; requests doesn't promise a Session is safe to share across workers."""
+    s = getattr(_local, "session", None)
+    if s is None:
+        s = _local.session = new_session()
+        _sessions.append(s)
+    return s
+
+def close_sessions():
+    while _sessions:
+        _sessions.pop().close()
+
+def _send(method: str, url: str, **kwargs) -> requests.Response:
+    BUCKET.acquire()
+    r = session().request(method, url, timeout=30, **kwargs)
+    BUCKET.sync(r)
+    if r.status_code == 429:
+        raise RateLimitExceeded(f"429 after retries: {method} {url}", response=r)
+    return r
+
+def _req(method: str, url: str, payload: Union[Dict[str, Any], bytes, None] = None) -> Any:
+    """One ClickUp call; returns the parsed body ({} if empty), raises HTTPError on non-2xx."""
+    r = _send(method, url, **_body(payload))
     if not (200 <= r.status_code < 300):
         raise requests.HTTPError(f"{r.status_code} {r.text}", response=r)
-    return r.json() if r.text else {}
+    return r.json() if r.content else {}
 
 def print_step(msg: str): print(f"\n=== {msg}")
+def print_item(msg: str): sys.stdout.write(f"• {msg}\n")  # one write, so worker-thread lines don't interleave
 def die(msg: str):
-    print(f"\n❌ {msg}")
+    print(f"\n❌ {msg}", file=sys.stderr)
     sys.exit(1)
 
 # ------------- Guards -------------
 
+def validate_field_defs():
+    """Catch schema typos locally, before a ClickUp 400 strands a half-built list."""
+    for key, fields in LIST_TO_FIELDS.items():
+        seen = set()
+        for f in fields:
+            name = f.get("name")
+            if not name or name in seen:
+                die(f"{key}: missing or duplicate field name {name!r}")
+            seen.add(name)
+            if not f.get("key"):
+                die(f"{key}: field '{name}' has no config key")
+            if f.get("type") not in FIELD_TYPES:
+                die(f"{key}: field '{name}' has unsupported type {f.get('type')!r}")
+            if f["type"] == "dropdown":
+                opts = f.get("options") or ()
+                if not opts or len(set(opts)) != len(opts):
+                    die(f"{key}: dropdown '{name}' needs a non-empty list of unique options")
+
 def ensure_env():
     if not API_TOKEN:
         die("Missing CLICKUP_API_TOKEN")
@@ -125,108 +285,132 @@ def ensure_env():
     if not API_TOKEN.startswith("pk_"):
         die("CLICKUP_API_TOKEN must start with 'pk_'")
 
-def ensure_custom_fields_enabled(space_id: str, token: str, dry: bool):
+def ensure_custom_fields_enabled(space: Dict[str, Any], dry: bool):
     if dry:
-        print("• DRY RUN: would verify Custom Fields ClickApp"); return
-    data = get_json(f"https://api.clickup.com/api/v2/space/{space_id}", token)
-    enabled = data.get("features", {}).get("custom_fields", {}).get("enabled", False)
+        print_item("DRY RUN: would verify Custom Fields ClickApp"); return
+    # the space listing/create response already carries features; only GET if it didn't
+    features = space.get("features")
+    if features is None:
+        features = _req("GET", f"{API_BASE}/space/{space['id']}").get("features", {})
+    enabled = features.get("custom_fields", {}).get("enabled", False)
     if not enabled:
         die("Custom Fields ClickApp is disabled for this Space. "
             "Enable in ClickUp → Space settings → ClickApps → Custom Fields.")
 
 # ------------- Find/Create -------------
 
-def find_or_create_space(team_id: str, token: str, name: str, dry: bool) -> Dict[str, str]:
+def _by_name(items: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    # reversed so the first entry wins if ClickUp holds duplicate names
+    return {i.get("name"): i for i in reversed(items)}
+
+def _find_existing(url: str, key: str, name: str) -> Optional[Dict[str, Any]]:
+    """GET a ClickUp collection (spaces/folders/lists) and return the entry called `name`, if any."""
+    return _by_name(_req("GET", url).get(key, [])).get(name)
+
+def find_or_create_space(team_id: str, name: str, dry: bool) -> Dict[str, Any]:
     print_step(f"Space: lookup '{name}'")
     if dry:
-        print(f"• DRY RUN: would create/reuse space '{name}'")
+        print_item(f"DRY RUN: would create/reuse space '{name}'")
         return {"id": "DRY_SPACE_ID", "name": name}
-    spaces = get_json(f"https://api.clickup.com/api/v2/team/{team_id}/space", token).get("spaces", [])
-    for s in spaces:
-        if s.get("name") == name:
-            print(f"• Reusing space '{name}' ({s['id']})")
-            return {"id": s["id"], "name": s["name"]}
-    res = post_json(f"https://api.clickup.com/api/v2/team/{team_id}/space", token, {"name": name, "multiple_assignees": True})
-    print(f"• Created space '{name}' ({res['id']})")
-    return {"id": res["id"], "name": res["name"]}
+    url   = f"{API_BASE}/team/{team_id}/space"
+    found = _find_existing(url, "spaces", name)
+    if found:
+        print_item(f"Reusing space '{name}' ({found['id']})")
+        return {"id": found["id"], "name": found["name"], "features": found.get("features")}
+    res = _req("POST", url, {"name": name, "multiple_assignees": True})
+    print_item(f"Created space '{name}' ({res['id']})")
+    return {"id": res["id"], "name": res["name"], "features": res.get("features")}
 
-def find_or_create_folder(space_id: str, token: str, name: str, dry: bool) -> Dict[str, str]:
+def find_or_create_folder(space_id: str, name: str, dry: bool) -> Dict[str, str]:
     print_step(f"Folder: lookup '{name}'")
     if dry:
-        print(f"• DRY RUN: would create/reuse folder '{name}'")
+        print_item(f"DRY RUN: would create/reuse folder '{name}'")
         return {"id": "DRY_FOLDER_ID", "name": name}
-    folders = get_json(f"https://api.clickup.com/api/v2/space/{space_id}/folder", token).get("folders", [])
-    for f in folders:
-        if f.get("name") == name:
-            print(f"• Reusing folder '{name}' ({f['id']})")
-            return {"id": f["id"], "name": f["name"]}
-    res = post_json(f"https://api.clickup.com/api/v2/space/{space_id}/folder", token, {"name": name})
-    print(f"• Created folder '{name}' ({res['id']})")
+    url   = f"{API_BASE}/space/{space_id}/folder"
+    found = _find_existing(url, "folders", name)
+    if found:
+        print_item(f"Reusing folder '{name}' ({found['id']})")
+        return {"id": found["id"], "name": found["name"]}
+    res = _req("POST", url, {"name": name})
+    print_item(f"Created folder '{name}' ({res['id']})")
     return {"id": res["id"], "name": res["name"]}
 
-def find_or_create_list(folder_id: str, token: str, name: str, dry: bool) -> Dict[str, str]:
-    print_step(f"List: lookup '{name}'")
+def get_folder_lists(folder_id: str) -> Dict[str, Dict[str, Any]]:
+    """A folder's lists by name, so every list is resolved from one GET."""
+    data = _req("GET", f"{API_BASE}/folder/{folder_id}/list")
+    return _by_name(data.get("lists", []))
+
+def find_or_create_list(folder_id: str, name: str, in_folder: Dict[str, Dict[str, Any]],
+                        dry: bool) -> Tuple[Dict[str, str], bool]:
+    """Returns (list, created) so callers can skip lookups on a list that can't have fields yet.
+
+    `in_folder` is the folder's lists by name (see get_folder_lists).
+    """
     if dry:
-        print(f"• DRY RUN: would create/reuse list '{name}'")
-        return {"id": f"DRY_{name.upper().replace(' ','_')}", "name": name}
-    lists = get_json(f"https://api.clickup.com/api/v2/folder/{folder_id}/list", token).get("lists", [])
-    for l in lists:
-        if l.get("name") == name:
-            print(f"• Reusing list '{name}' ({l['id']})")
-            return {"id": l["id"], "name": l["name"]}
-    res = post_json(f"https://api.clickup.com/api/v2/folder/{folder_id}/list", token, {"name": name})
-    print(f"• Created list '{name}' ({res['id']})")
-    return {"id": res["id"], "name": res["name"]}
+        print_item(f"DRY RUN: would create/reuse list '{name}'")
+        return {"id": f"DRY_{name.upper().replace(' ','_')}", "name": name}, False
+    found = in_folder.get(name)
+    if found:
+        print_item(f"Reusing list '{name}' ({found['id']})")
+        return {"id": found["id"], "name": found["name"]}, False
+    res = _req("POST", f"{API_BASE}/folder/{folder_id}/list", {"name": name})
+    print_item(f"Created list '{name}' ({res['id']})")
+    return {"id": res["id"], "name": res["name"]}, True
 
 # ------------- Status workflow -------------
 
-def apply_status_workflow(list_id: str, token: str, dry: bool):
+def apply_status_workflow(list_id: str, dry: bool):
     if dry:
-        print(f"• DRY RUN: would set statuses on {list_id}: {[s['status'] for s in STATUS_WORKFLOW]}")
+        print_item(f"DRY RUN: would set statuses on {list_id}: {[s['status'] for s in STATUS_WORKFLOW]}")
         return
-    payload = {"override_statuses": True, "statuses": STATUS_WORKFLOW}
-    put_json(f"https://api.clickup.com/api/v2/list/{list_id}", token, payload)
-    print(f"• Applied statuses on list {list_id}")
+    _req("PUT", f"{API_BASE}/list/{list_id}", STATUS_WORKFLOW_BODY)
+    print_item(f"Applied statuses on list {list_id}")
 
 # ------------- Field helpers -------------
 
-def get_list_fields(list_id: str, token: str) -> List[Dict[str, Any]]:
-    data = get_json(f"https://api.clickup.com/api/v2/list/{list_id}/field", token)
-    return data.get("fields", [])
+def get_list_fields(list_id: str) -> Dict[str, Dict[str, Any]]:
+    """A list's fields by name."""
+    data = _req("GET", f"{API_BASE}/list/{list_id}/field")
+    return _by_name(data.get("fields", []))
 
-def find_existing_field(fields: List[Dict[str, Any]], name: str) -> Optional[Dict[str, Any]]:
-    for f in fields:
-        if f.get("name") == name:
-            return f
-    return None
-
-def create_field_payload(field_def: Dict[str, Any]) -> Dict[str, Any]:
+def create_field_payload(field_def: Mapping[str, Any]) -> Dict[str, Any]:
     payload = {"name": field_def["name"], "type": field_def["type"]}
     if field_def["type"] == "dropdown":
-        opts = field_def.get("options", [])
+        opts = field_def.get("options", ())
         payload["type_config"] = {"options": [{"name": o} for o in opts]}
     return payload
 
-def create_or_reuse_field(list_id: str, token: str, field_def: Dict[str, Any], dry: bool) -> Dict[str, Any]:
-    """Returns API field object with id; raises if API returns no id on create."""
+def build_field_payloads() -> Dict[Tuple[str, str], bytes]:
+    """Each field's POST body by (list key, field name), encoded once per run like STATUS_WORKFLOW_BODY.
+
+    Built by main() after validate_field_defs(), so a malformed def gets its message, not a KeyError.
+    """
+    return {(key, f["name"]): json.dumps(create_field_payload(f)).encode()
+            for key, fields in LIST_TO_FIELDS.items() for f in fields}
+
+def create_or_reuse_field(list_id: str, field_def: Mapping[str, Any], payload: bytes,
+                          existing: Dict[str, Dict[str, Any]], dry: bool) -> Dict[str, Any]:
+    """Returns API field object with id; raises if API returns no id on create.
+
+    `payload` is the def's encoded POST body (see build_field_payloads).
+    `existing` is the list's fields by name, fetched once per run; new fields are added to it.
+    """
     if dry:
         dummy = {"id": f"DRY_CF_{field_def['name']}", "name": field_def["name"], "type": field_def["type"]}
         if field_def["type"] == "dropdown":
             dummy["type_config"] = {"options": [{"name": o, "id": f"DRY_OPT_{o}"} for o in field_def.get("options", [])]}
-        print(f"• DRY RUN: would create/reuse field '{field_def['name']}'")
+        print_item(f"DRY RUN: would create/reuse field '{field_def['name']}' on list {list_id}")
         return dummy
 
-    existing = get_list_fields(list_id, token)
-    found    = find_existing_field(existing, field_def["name"])
+    found = existing.get(field_def["name"])
     if found:
-        print(f"• Reusing field '{field_def['name']}' ({found['id']})")
+        print_item(f"Reusing field '{field_def['name']}' on list {list_id} ({found['id']})")
         return found
 
-    payload = create_field_payload(field_def)
     try:
-        res = post_json(f"https://api.clickup.com/api/v2/list/{list_id}/field", token, payload)
+        res = _req("POST", f"{API_BASE}/list/{list_id}/field", payload)
     except requests.HTTPError as e:
-        raise SystemExit(f"❌ Failed to create field '{field_def['name']}' on list {list_id}: {e.response.text}") from e
+        raise SystemExit(f"❌ Failed to create field '{field_def['name']}' on list {list_id}: {e}") from e
 
     fid = res.get("id")
     if not fid:
@@ -236,107 +420,164 @@ def create_or_reuse_field(list_id: str, token: str, field_def: Dict[str, Any], d
             f"   Response: {json.dumps(res, indent=2)}\n"
             "   Tip: Use 'short_text' instead of unsupported types."
         )
-    print(f"• Created field '{field_def['name']}' ({fid})")
+    existing[field_def["name"]] = res
+    print_item(f"Created field '{field_def['name']}' on list {list_id} ({fid})")
     return res
 
+# ------------- Outputs -------------
+
+def write_text(path: str, data: str):
+    """Write the whole payload in one call to a temp file, then atomically swap it into place."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def write_json(path: str, obj: Any):
+    write_text(path, json.dumps(obj, indent=2))
+
 # ------------- Orchestration -------------
 
+def _cache_matches_schema(cached: Dict[str, Any]) -> bool:
+    """Compare a previous run's clickupFields.json with the names, statuses and fields defined above."""
+    if cached.get("team_id") != TEAM_ID or cached.get("status_workflow") != STATUS_WORKFLOW:
+        return False
+    if cached["space"]["name"] != SPACE_NAME or cached["folder"]["name"] != FOLDER_NAME:
+        return False
+    lists, fields, options = cached["lists"], cached["fields"], cached["options"]
+    if set(lists) != set(LISTS):
+        return False
+    for key, defs in LIST_TO_FIELDS.items():
+        if lists[key]["name"] != LISTS[key] or not lists[key]["id"]:
+            return False
+        if set(fields[key]) != {f["key"] for f in defs}:
+            return False
+        for f in defs:
+            if f["type"] == "dropdown" and set(options[key][f["key"]]) != set(f["options"]):
+                return False
+    return True
+
+def previous_run_is_current() -> bool:
+    """True when the last run's config still describes this schema; costs one GET.
+
+    Only the issues list is checked live (token access and field ids); the rest of
+    the cached config is trusted. Use --force to re-verify everything.
+    """
+    try:
+        with open("config/clickupFields.json", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return False
+    others = ("config/clickupFields-adapted.json", "clickup-config.json", "clickup-env-vars.txt")
+    if not isinstance(cached, dict) or not all(map(os.path.exists, others)):
+        return False
+    try:
+        if not _cache_matches_schema(cached):
+            return False
+    except (KeyError, TypeError, AttributeError):  # a hand-edited or older file of another shape
+        return False
+
+    fields = cached["fields"]["issues"]
+    try:
+        live = get_list_fields(cached["lists"]["issues"]["id"])
+    except requests.HTTPError:
+        return False
+    return all((live.get(f["name"]) or {}).get("id") == fields[f["key"]] for f in LIST_TO_FIELDS["issues"])
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--force", action="store_true", help="ignore the previous run's config and re-check everything")
     args = parser.parse_args()
     dry = DRY_ENV or args.dry_run
 
+    validate_field_defs()
+    field_payloads = build_field_payloads()
     ensure_env()
+    # an unwritable checkout should fail here, before anything is created in ClickUp
+    os.makedirs("config", exist_ok=True)
 
     print("\nFido ClickUp Scaffolding")
     print("========================")
     print(f"Team: {TEAM_ID} | Dry run: {dry}")
 
-    # Space → Folder → Lists
-    space  = find_or_create_space(TEAM_ID, API_TOKEN, SPACE_NAME, dry)
-    ensure_custom_fields_enabled(space["id"], API_TOKEN, dry)
-    folder = find_or_create_folder(space["id"], API_TOKEN, FOLDER_NAME, dry)
-
-    list_ids: Dict[str, str] = {}
-    for key, name in LISTS.items():
-        l = find_or_create_list(folder["id"], API_TOKEN, name, dry)
-        list_ids[key] = l["id"]
-        apply_status_workflow(l["id"], API_TOKEN, dry)
-
-    # Fields
-    full_cfg   = {"lists": {k: {"id": list_ids[k], "name": LISTS[k]} for k in list_ids},
-                  "fields": {}, "options": {}}
-    adapted    = {"lists": {k: list_ids[k] for k in list_ids}, "fields": {}, "options": {}}
-
-    # normalize map for Slack usage
-    def norm(name: str) -> str:
-        mapping = {
-            "Slack Ticket ID": "slack_ticket_id",
-            "Slack Permalink": "slack_permalink",
-            "Submitted By (Slack User)": "submitted_by",
-            "Customer Name": "customer_name",
-            "Market Code": "market_code",
-            "Property/Unit": "property_unit",
-            "Notes": "notes",
-            "Issue Type": "issue_type",
-            "Priority Level": "priority",
-            "Inquiry Type": "inquiry_type",
-            "Response Priority": "response_priority",
-            "Change Type": "change_type",
-            "Trash Pickup Day": "trash_day",
-            "Recycling Day": "recycling",
-            "Effective Date": "effective_date",
-        }
-        return mapping.get(name, name)
+    if not (dry or args.force) and previous_run_is_current():
+        print("\n✅ Previous run's config is current (cached, nothing to do). Use --force to re-check.")
+        return
 
+    # Space → Folder → Lists
+    space  = find_or_create_space(TEAM_ID, SPACE_NAME, dry)
+    ensure_custom_fields_enabled(space, dry)
+    folder = find_or_create_folder(space["id"], FOLDER_NAME, dry)
+
+    print_step(f"Lists in '{FOLDER_NAME}'")
+    with ThreadPoolExecutor(max_workers=API_WORKERS) as pool:
+        try:
+            # one listing for the folder; missing lists are then created concurrently
+            in_folder = {} if dry else get_folder_lists(folder["id"])
+            list_futs = {key: pool.submit(find_or_create_list, folder["id"], name, in_folder, dry)
+                         for key, name in LISTS.items()}
+            resolved  = {key: fut.result() for key, fut in list_futs.items()}
+            list_ids  = {key: l["id"] for key, (l, _) in resolved.items()}
+            new_lists = {l["id"] for l, created in resolved.values() if created}
+
+            # statuses and every list's fields only need the list ids, so they go out as one wave;
+            # field results are read back in definition order
+            print_step("Statuses and custom fields (all lists)")
+            status_futs = [pool.submit(apply_status_workflow, lid, dry) for lid in list_ids.values()]
+            # existing fields are looked up once per list, alongside the status PUTs;
+            # a list created just now has none, so it skips the GET
+            lookups  = {lid: pool.submit(get_list_fields, lid)
+                        for lid in list_ids.values() if not dry and lid not in new_lists}
+            existing = {lid: lookups[lid].result() if lid in lookups else {} for lid in list_ids.values()}
+            futures = {
+                key: [pool.submit(create_or_reuse_field, list_ids[key], fdef,
+                                  field_payloads[key, fdef["name"]], existing[list_ids[key]], dry)
+                      for fdef in LIST_TO_FIELDS[key]]
+                for key in ["issues", "inquiries", "units"]
+            }
+            for fut in status_futs:
+                fut.result()
+            field_objs = {key: [fut.result() for fut in futs] for key, futs in futures.items()}
+        except BaseException:  # field failures arrive as SystemExit
+            pool.shutdown(cancel_futures=True)  # drop queued requests instead of draining them
+            raise
+
+    # one structure, built once; every artifact below is a view onto it
+    cfg: Dict[str, Any] = {
+        "space":    {"id": space["id"], "name": SPACE_NAME},
+        "folder":   {"id": folder["id"], "name": FOLDER_NAME},
+        "lists":    {k: {"id": list_ids[k], "name": LISTS[k]} for k in list_ids},
+        "fields":   {},
+        "options":  {},
+        "statuses": [s["status"] for s in STATUS_WORKFLOW],
+    }
     for key in ["issues", "inquiries", "units"]:
-        fields_def = LIST_TO_FIELDS[key]
-        lid        = list_ids[key]
-
-        print_step(f"Custom fields for '{LISTS[key]}'")
-        for fdef in fields_def:
-            field_obj = create_or_reuse_field(lid, API_TOKEN, fdef, dry)
-
-            fname = norm(fdef["name"])
-            full_cfg["fields"].setdefault(key, {})[fname] = field_obj["id"]
-            adapted["fields"].setdefault(key, {})[fname]  = field_obj["id"]
+        fields_out = cfg["fields"][key]  = {}
+        opts_out   = cfg["options"][key] = {}
+        for fdef, field_obj in zip(LIST_TO_FIELDS[key], field_objs[key]):
+            fname = fdef["key"]
+            fields_out[fname] = field_obj["id"]
 
             # capture dropdown option IDs
             if fdef["type"] == "dropdown":
-                opts = (field_obj.get("type_config") or {}).get("options", [])
-                name_to_id = { (o.get("name") or o.get("label")): o.get("id") for o in opts if o.get("id") }
-                full_cfg["options"].setdefault(key, {})[fname] = name_to_id
-                adapted["options"].setdefault(key, {})[fname]  = name_to_id
+                opts  = (field_obj.get("type_config") or {}).get("options", [])
+                pairs = [(o.get("name") or o.get("label"), o.get("id")) for o in opts]
+                opts_out[fname] = {n: i for n, i in pairs if n and i}
 
     # Outputs
-    os.makedirs("config", exist_ok=True)
-    with open("config/clickupFields.json", "w", encoding="utf-8") as f:
-        json.dump({
-            "team_id": TEAM_ID,
-            "space": {"id": space["id"], "name": SPACE_NAME},
-            "folder": {"id": folder["id"], "name": FOLDER_NAME},
-            **full_cfg
-        }, f, indent=2)
-
-    with open("config/clickupFields-adapted.json", "w", encoding="utf-8") as f:
-        json.dump(adapted, f, indent=2)
-
-    with open("clickup-config.json", "w", encoding="utf-8") as f:
-        json.dump({
-            "space": {"id": space["id"], "name": SPACE_NAME},
-            "folder": {"id": folder["id"], "name": FOLDER_NAME},
-            "lists": {k: {"id": list_ids[k], "name": LISTS[k]} for k in list_ids},
-            "statuses": [s["status"] for s in STATUS_WORKFLOW]
-        }, f, indent=2)
-
-    with open("clickup-env-vars.txt", "w", encoding="utf-8") as f:
-        f.write(f"CLICKUP_TEAM_ID={TEAM_ID}\n")
-        f.write(f"CLICKUP_SPACE_ID={space['id']}\n")
-        f.write(f"CLICKUP_FOLDER_ID={folder['id']}\n")
-        f.write(f"CLICKUP_LIST_ID_ISSUES={list_ids['issues']}\n")
-        f.write(f"CLICKUP_LIST_ID_INQUIRIES={list_ids['inquiries']}\n")
-        f.write(f"CLICKUP_LIST_ID_UNITS={list_ids['units']}\n")
+    write_json("config/clickupFields.json", {
+        "team_id": TEAM_ID,
+        **{k: cfg[k] for k in ("space", "folder", "lists", "fields", "options")},
+        "status_workflow": STATUS_WORKFLOW,  # full definitions, so the next run can tell if they changed
+    })
+    write_json("config/clickupFields-adapted.json",
+               {"lists": list_ids, "fields": cfg["fields"], "options": cfg["options"]})
+    write_json("clickup-config.json", {k: cfg[k] for k in ("space", "folder", "lists", "statuses")})
+
+    env_lines = [f"CLICKUP_TEAM_ID={TEAM_ID}", f"CLICKUP_SPACE_ID={space['id']}", f"CLICKUP_FOLDER_ID={folder['id']}"]
+    env_lines += [f"CLICKUP_LIST_ID_{k.upper()}={v}" for k, v in list_ids.items()]
+    write_text("clickup-env-vars.txt", "\n".join(env_lines) + "\n")
 
     print("\n✅ Scaffolding complete (idempotent). Safe to re-run anytime.")
 
@@ -349,3 +590,5 @@ if __name__ == "__main__":
         raise
     except Exception as e:
         die(f"Error: {e}")
+    finally:
+        close_sessions()